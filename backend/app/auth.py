@@ -40,20 +40,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def get_token_subject(token: str):
+    # Devuelve el `sub` (employee_number) de un token válido, o None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+def _load_current_user(token: str, db: Session):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        employee_number: str = payload.get("sub") # 'sub' es el campo estándar para el sujeto del token
-        if employee_number is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(employee_number=employee_number)
-    except JWTError:
+    employee_number = get_token_subject(token) # 'sub' es el campo estándar para el sujeto del token
+    if employee_number is None:
         raise credentials_exception
+    token_data = schemas.TokenData(employee_number=employee_number)
 
     user = crud.get_user_by_employee_number(db, employee_number=token_data.employee_number)
     if user is None:
@@ -62,11 +66,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
          raise HTTPException(status_code=400, detail="Inactive user")
     return user
 
+# El usuario se carga del primario: así un usuario desactivado o sin permisos
+# de administrador no conserva el acceso de escritura mientras dura el retraso de la réplica
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    return _load_current_user(token, db)
+
+# Variante para rutas de solo lectura de usuarios normales: carga el usuario desde la
+# réplica (si la hay). Las rutas de administración comprueban siempre en el primario
+async def get_current_user_read(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_read_db)):
+    return _load_current_user(token, db)
+
 # Dependencia para obtener el usuario activo actual (simplifica las rutas protegidas)
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     # Podrías añadir más chequeos aquí si fuera necesario (ej. roles)
     return current_user
 
+async def get_current_active_user_read(current_user: models.User = Depends(get_current_user_read)):
+    return current_user
+
 # Dependencia para verificar si el usuario es administrador
 async def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
     if not current_user.isAdmin:
@@ -75,4 +92,4 @@ async def get_current_admin_user(current_user: models.User = Depends(get_current
             detail="No tiene permisos de administrador",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return current_user
\ No newline at end of file
+    return current_user
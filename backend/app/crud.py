@@ -1,17 +1,17 @@
 from sqlalchemy.orm import Session
 from typing import Optional
-from . import models, schemas, auth
-from datetime import datetime
+from . import models, schemas, auth, statements
+from datetime import datetime, timezone
 
 # Funciones CRUD para usuarios
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.scalar(statements.user_by_id, {"user_id": user_id})
 
 def get_user_by_employee_number(db: Session, employee_number: str):
-    return db.query(models.User).filter(models.User.employee_number == employee_number).first()
+    return db.scalar(statements.user_by_employee_number, {"employee_number": employee_number})
 
 def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+    return db.scalars(statements.users_page, {"skip": skip, "limit": limit}).all()
 
 def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = auth.get_password_hash(user.password)
@@ -29,45 +29,25 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
-# Nueva función para que un usuario actualice su propio perfil
-def update_user_profile(db: Session, user_id: int, user_data: schemas.UserUpdate):
-    db_user = get_user(db, user_id)
-    if not db_user:
-        return None # O lanzar excepción si se prefiere
-
-    update_data = user_data.dict(exclude_unset=True) # Obtener solo los campos proporcionados
-
-    for key, value in update_data.items():
-        setattr(db_user, key, value)
-
-    db.commit()
-    db.refresh(db_user)
-    return db_user
-
 # Funciones CRUD para Works
 def get_works(db: Session, user_id: Optional[int] = None, skip: int = 0, limit: int = 100):
-    query = db.query(models.Work)
     if user_id is not None:
-        query = query.filter(models.Work.user_id == user_id)
-    return query.offset(skip).limit(limit).all()
+        return db.scalars(statements.works_by_user_page, {"user_id": user_id, "skip": skip, "limit": limit}).all()
+    return db.scalars(statements.works_page, {"skip": skip, "limit": limit}).all()
 
 def get_work(db: Session, work_id: int):
-    return db.query(models.Work).filter(models.Work.id == work_id).first()
+    return db.scalar(statements.work_by_id, {"work_id": work_id})
+
+def get_work_by_number(db: Session, work_number: str):
+    return db.scalar(statements.work_by_number, {"work_number": work_number})
 
 def create_work(db: Session, work: schemas.WorkCreate, user_id: int):
     # Validar unicidad por número de obra
-    existe = db.query(models.Work).filter(models.Work.work_number == work.work_number).first()
+    existe = get_work_by_number(db, work.work_number)
     if existe:
         raise Exception("Ya existe una obra con ese número")
     
-    db_work = models.Work(
-        work_number=work.work_number,
-        title=work.title,
-        description=work.description,
-        user_id=user_id,
-        status="active"
-    )
-    db.add(db_work)
+    db_work = add_work(db, work, user_id=user_id)
     db.commit()
     db.refresh(db_work)
     return db_work
@@ -91,3 +71,84 @@ def delete_work(db: Session, work_id: int, user_id: int):
     return False
 
 
+# Operaciones de escritura sin commit: solo hacen flush y devuelven el objeto.
+# El commit (y el refresh) lo hace quien las llama, directamente o a través de group_commit
+def apply_user_profile_update(db: Session, user_id: int, user_data: schemas.UserUpdate):
+    db_user = get_user(db, user_id)
+    if not db_user:
+        return None
+
+    update_data = user_data.dict(exclude_unset=True) # Obtener solo los campos proporcionados
+
+    for key, value in update_data.items():
+        setattr(db_user, key, value)
+
+    db.flush()
+    return db_user
+
+def add_work(db: Session, work: schemas.WorkCreate, user_id: Optional[int] = None):
+    db_work = models.Work(**work.dict(), user_id=user_id, status="active")
+    db.add(db_work)
+    db.flush()
+    return db_work
+
+def apply_work_update(db: Session, work_id: int, work_data: schemas.WorkCreate):
+    db_work = get_work(db, work_id)
+    if not db_work:
+        return None
+
+    for key, value in work_data.dict().items():
+        setattr(db_work, key, value)
+
+    db.flush()
+    return db_work
+
+# Funciones CRUD para trabajos de informes
+def create_report_job(db: Session, job: schemas.ReportJobCreate, requested_by: int):
+    db_job = models.ReportJob(
+        requested_by=requested_by,
+        format=job.format,
+        status="pending",
+        filter_user_id=job.user_id,
+        filter_status=job.status,
+        date_from=job.date_from,
+        date_to=job.date_to,
+        heartbeat_at=datetime.now(timezone.utc) # Momento en que se encola
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_report_job(db: Session, job_id: int):
+    return db.scalar(statements.report_job_by_id, {"job_id": job_id})
+
+def get_report_jobs(db: Session, requested_by: int, skip: int = 0, limit: int = 100):
+    return db.scalars(
+        statements.report_jobs_by_user_page, {"requested_by": requested_by, "skip": skip, "limit": limit}
+    ).all()
+
+def claim_report_job(db: Session, job_id: int, now: datetime):
+    # Solo un proceso puede pasar el trabajo de pending a running
+    claimed = db.execute(statements.claim_report_job, {"job_id": job_id, "now": now}).rowcount
+    db.commit()
+    return claimed == 1
+
+def fail_report_job(db: Session, job_id: int, error: str, now: datetime):
+    db_job = get_report_job(db, job_id)
+    if db_job is not None:
+        db_job.status = "failed"
+        db_job.error = error
+        db_job.finished_at = now
+        db.commit()
+    return db_job
+
+def requeue_stale_report_jobs(db: Session, stale_before: datetime, now: datetime):
+    # Devuelve a pending los trabajos running cuyo worker dejó de dar señales y
+    # devuelve los pending que llevan demasiado tiempo sin que nadie los reclame
+    db.execute(statements.requeue_stale_report_jobs, {"stale_before": stale_before})
+    job_ids = db.scalars(statements.stale_pending_report_job_ids, {"stale_before": stale_before}).all()
+    if job_ids:
+        db.execute(statements.touch_pending_report_jobs, {"job_ids": job_ids, "now": now})
+    db.commit()
+    return job_ids
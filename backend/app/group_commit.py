@@ -0,0 +1,211 @@
+import os
+import queue
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from dotenv import load_dotenv
+
+from . import database
+
+load_dotenv()
+
+# Group commit (opcional): las escrituras concurrentes se agrupan en una sola
+# transacción que ejecuta un único hilo escritor. Cada operación va en su propio
+# savepoint, así que un error solo afecta a esa operación, y cada petición recibe
+# su respuesta cuando el commit compartido ha terminado.
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", 3))
+GROUP_COMMIT_MAX_OPS = int(os.getenv("GROUP_COMMIT_MAX_OPS", 64))
+
+def _create_writer_engine():
+    url = database.SQLALCHEMY_DATABASE_URL
+    if not url.startswith("sqlite"):
+        return database.engine
+
+    # pysqlite gestiona las transacciones por su cuenta y rompe los SAVEPOINT;
+    # el engine del escritor emite él mismo el BEGIN (receta de la documentación
+    # de SQLAlchemy). Es un engine aparte para no cambiar el resto de sesiones.
+    # BEGIN IMMEDIATE reserva la escritura desde el principio: con un BEGIN diferido
+    # cada operación lee primero (lock SHARED) y, si otra conexión está escribiendo,
+    # la subida a RESERVED falla al instante sin esperar al busy timeout.
+    writer_engine = create_engine(url, **database.engine_args(url))
+
+    @event.listens_for(writer_engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(writer_engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    database.track_statement_cache(writer_engine, "writer")
+    return writer_engine
+
+class _Operation:
+    def __init__(self, op, args):
+        self.op = op
+        self.args = args
+        self.future = Future()
+
+class GroupCommitWriter:
+    def __init__(self, window_ms: float = GROUP_COMMIT_WINDOW_MS, max_ops: int = GROUP_COMMIT_MAX_OPS):
+        self.window = window_ms / 1000
+        self.max_ops = max_ops
+        # Sin expirar en el commit: los objetos devueltos se usan después de cerrar la sesión
+        self.SessionLocal = sessionmaker(
+            autocommit=False, autoflush=False, expire_on_commit=False, bind=_create_writer_engine()
+        )
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op, *args):
+        operation = _Operation(op, args)
+        with self._lock:
+            # Fallar enseguida en vez de dejar la petición esperando a un escritor detenido
+            if self._closed:
+                raise RuntimeError("El escritor de group commit está detenido")
+            self._queue.put(operation)
+        return operation.future
+
+    def is_alive(self):
+        return self._thread.is_alive() and not self._closed
+
+    def stop(self):
+        with self._lock:
+            if not self._closed:
+                self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            with self._lock:
+                self._closed = True
+            # Lo que quedara en la cola ya no se va a ejecutar
+            while True:
+                try:
+                    operation = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if operation is not None and not operation.future.done():
+                    operation.future.set_exception(RuntimeError("El escritor de group commit está detenido"))
+
+    def _loop(self):
+        stopping = False
+        while not stopping:
+            operation = self._queue.get()
+            if operation is None:
+                break
+
+            # Esperar como mucho la ventana (o hasta max_ops) para agrupar más escrituras
+            batch = [operation]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_ops:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    operation = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if operation is None:
+                    stopping = True
+                    break
+                batch.append(operation)
+
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                # _commit_batch ya ha resuelto las operaciones del lote; el hilo sigue vivo
+                print(f"Error en el escritor de group commit: {e}")
+
+    def _commit_batch(self, batch):
+        db = None
+        done = []
+        error = None
+        try:
+            db = self.SessionLocal()
+            for operation in batch:
+                if not operation.future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with db.begin_nested():
+                        result = operation.op(db, *operation.args)
+                        # Cargar los valores generados por la base de datos dentro del
+                        # savepoint: tras el commit no se expiran (expire_on_commit=False)
+                        if result is not None:
+                            db.refresh(result)
+                except Exception as e:
+                    operation.future.set_exception(e)
+                else:
+                    done.append((operation, result))
+            db.commit()
+        except Exception as e:
+            # Si falla el commit compartido, fallan todas las operaciones que lo esperaban
+            error = e
+            if db is not None:
+                try:
+                    db.rollback()
+                except Exception:
+                    pass
+        finally:
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+            # Ninguna petición puede quedarse esperando: se resuelven todas las del lote
+            for operation, result in done:
+                if error is None:
+                    operation.future.set_result(result)
+                else:
+                    operation.future.set_exception(error)
+            for operation in batch:
+                if not operation.future.done():
+                    operation.future.set_exception(error or RuntimeError("El lote de group commit se interrumpió"))
+
+_writer: Optional[GroupCommitWriter] = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        # Si el hilo escritor ha muerto se arranca otro en lugar de encolar en el vacío
+        if _writer is None or not _writer.is_alive():
+            _writer = GroupCommitWriter()
+        return _writer
+
+def shutdown_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+
+def run_write(db: Session, op, *args):
+    """Ejecuta `op(db, *args)` y confirma la escritura.
+
+    Con GROUP_COMMIT activo la operación se delega al hilo escritor y se espera
+    al commit compartido; si no, se hace commit en la sesión de la petición.
+    """
+    if GROUP_COMMIT:
+        return get_writer().submit(op, *args).result()
+    result = op(db, *args)
+    if result is not None:
+        db.commit()
+        db.refresh(result)
+    return result
+
+async def run_write_async(db: Session, op, *args):
+    """Versión de run_write para rutas async: no bloquea el event loop mientras espera."""
+    if GROUP_COMMIT:
+        return await asyncio.wrap_future(get_writer().submit(op, *args))
+    return run_write(db, op, *args)
@@ -1,11 +1,12 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import timedelta
 from typing import List, Optional # Importar Optional
 
-from . import crud, models, schemas, auth, database
+from . import crud, models, schemas, auth, database, reports, group_commit
 from .init_db import init_db
 
 # Crea las tablas en la base de datos (si no existen)
@@ -34,6 +35,29 @@ app.add_middleware(
     allow_headers=["*"], # Permite todas las cabeceras
 )
 
+# Identificar al usuario del token (si lo hay) y registrar sus escrituras correctas
+# para que sus lecturas inmediatas vayan al primario (read-your-writes) aunque haya réplica
+@app.middleware("http")
+async def track_writes(request: Request, call_next):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    request.state.identity = auth.get_token_subject(token) if scheme.lower() == "bearer" and token else None
+    response = await call_next(request)
+    if request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400:
+        database.mark_write(request.state.identity)
+    return response
+
+# Reencolar periódicamente los informes abandonados (también al arrancar); al
+# cerrar, detener la revisión, el pool de informes y el hilo de group commit
+@app.on_event("startup")
+def start_report_workers():
+    reports.start_reaper()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    reports.stop_reaper()
+    reports.shutdown_executor()
+    group_commit.shutdown_writer()
+
 # --- Rutas de Autenticación ---
 
 @app.post("/api/v1/auth/register", response_model=schemas.UserPublic, status_code=status.HTTP_201_CREATED)
@@ -43,6 +67,7 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_d
         raise HTTPException(status_code=400, detail="Número de empleado ya registrado")
     # Aquí podrías añadir más validaciones (ej. complejidad contraseña)
     created_user = crud.create_user(db=db, user=user)
+    database.mark_write(created_user.employee_number)
     return created_user
 
 @app.post("/api/v1/auth/token", response_model=schemas.Token)
@@ -59,6 +84,10 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     if not user.is_active:
          raise HTTPException(status_code=400, detail="Usuario inactivo")
 
+    # Las primeras lecturas con el token nuevo van al primario, por si la réplica
+    # todavía no tiene al usuario recién registrado
+    database.mark_write(user.employee_number)
+
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
         data={"sub": user.employee_number}, expires_delta=access_token_expires
@@ -68,7 +97,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 # --- Rutas Protegidas ---
 
 @app.get("/api/v1/users/me", response_model=schemas.UserPublic)
-async def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
+async def read_users_me(current_user: models.User = Depends(auth.get_current_active_user_read)):
     # La dependencia get_current_active_user ya valida el token y retorna el usuario
     return current_user
 
@@ -79,7 +108,7 @@ async def update_current_user_profile(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    updated_user = crud.update_user_profile(db, user_id=current_user.id, user_data=user_data)
+    updated_user = await group_commit.run_write_async(db, crud.apply_user_profile_update, current_user.id, user_data)
     if not updated_user:
         # Esto no debería ocurrir si el token es válido, pero por si acaso
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
@@ -92,13 +121,18 @@ def health_check():
 
 # --- Rutas de Administración ---
 
+@app.get("/api/v1/admin/stats/statement-cache", response_model=dict)
+async def get_statement_cache_stats(current_admin: models.User = Depends(auth.get_current_admin_user)):
+    # Tasa de aciertos de la caché de sentencias compiladas de SQLAlchemy
+    return database.get_statement_cache_stats()
+
 @app.get("/api/v1/admin/users", response_model=List[schemas.UserPublic])
-async def get_all_users(current_admin: models.User = Depends(auth.get_current_admin_user), db: Session = Depends(database.get_db)):
+async def get_all_users(current_admin: models.User = Depends(auth.get_current_admin_user), db: Session = Depends(database.get_read_db)):
     users = crud.get_users(db)
     return users
 
 @app.get("/api/v1/admin/users/{user_id}", response_model=schemas.UserPublic)
-async def get_user_by_id(user_id: int, current_admin: models.User = Depends(auth.get_current_admin_user), db: Session = Depends(database.get_db)):
+async def get_user_by_id(user_id: int, current_admin: models.User = Depends(auth.get_current_admin_user), db: Session = Depends(database.get_read_db)):
     user = crud.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
@@ -142,30 +176,27 @@ def create_work(
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     # Verificar si el número de obra ya existe
-    db_work = db.query(models.Work).filter(models.Work.work_number == work.work_number).first()
+    db_work = crud.get_work_by_number(db, work.work_number)
     if db_work:
         raise HTTPException(status_code=400, detail="El número de obra ya existe")
     
     # Crear la obra asociada al usuario actual
-    db_work = models.Work(**work.dict(), user_id=current_user.id)
-    db.add(db_work)
-    db.commit()
-    db.refresh(db_work)
+    db_work = group_commit.run_write(db, crud.add_work, work, current_user.id)
     return db_work
 
 @app.get("/api/v1/obras/", response_model=List[schemas.Work])
 def read_works(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: Session = Depends(database.get_read_db),
+    current_user: models.User = Depends(auth.get_current_active_user_read)
 ):
     # Obtener solo las obras del usuario actual
-    works = db.query(models.Work).filter(models.Work.user_id == current_user.id).offset(skip).limit(limit).all()
+    works = crud.get_works(db, user_id=current_user.id, skip=skip, limit=limit)
     return works
 
 @app.get("/api/v1/obras/{obra_id}", response_model=schemas.Obras)
-def read_user_obra(obra_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_active_user)):
+def read_user_obra(obra_id: int, db: Session = Depends(database.get_read_db), current_user: models.User = Depends(auth.get_current_active_user_read)):
     """Obtiene una obra específica si pertenece al usuario autenticado."""
     db_obra = crud.get_obra(db, obra_id=obra_id)
     if db_obra is None:
@@ -214,9 +245,9 @@ async def get_all_obras(
     skip: int = 0,
     limit: int = 100,
     current_admin: models.User = Depends(auth.get_current_admin_user),
-    db: Session = Depends(database.get_db)
+    db: Session = Depends(database.get_read_db)
 ):
-    works = db.query(models.Work).offset(skip).limit(limit).all()
+    works = crud.get_works(db, skip=skip, limit=limit)
     return works
 
 @app.post("/api/v1/admin/obras", response_model=schemas.Work)
@@ -226,24 +257,21 @@ async def create_obra_admin(
     db: Session = Depends(database.get_db)
 ):
     # Verificar si el número de obra ya existe
-    db_work = db.query(models.Work).filter(models.Work.work_number == work.work_number).first()
+    db_work = crud.get_work_by_number(db, work.work_number)
     if db_work:
         raise HTTPException(status_code=400, detail="El número de obra ya existe")
     
     # Crear la obra
-    db_work = models.Work(**work.dict(), status="active")
-    db.add(db_work)
-    db.commit()
-    db.refresh(db_work)
+    db_work = await group_commit.run_write_async(db, crud.add_work, work)
     return db_work
 
 @app.get("/api/v1/admin/obras/{work_id}", response_model=schemas.Work)
 async def get_obra_by_id(
     work_id: int,
     current_admin: models.User = Depends(auth.get_current_admin_user),
-    db: Session = Depends(database.get_db)
+    db: Session = Depends(database.get_read_db)
 ):
-    work = db.query(models.Work).filter(models.Work.id == work_id).first()
+    work = crud.get_work(db, work_id)
     if not work:
         raise HTTPException(status_code=404, detail="Obra no encontrada")
     return work
@@ -255,15 +283,9 @@ async def update_obra_admin(
     current_admin: models.User = Depends(auth.get_current_admin_user),
     db: Session = Depends(database.get_db)
 ):
-    work = db.query(models.Work).filter(models.Work.id == work_id).first()
+    work = await group_commit.run_write_async(db, crud.apply_work_update, work_id, work_data)
     if not work:
         raise HTTPException(status_code=404, detail="Obra no encontrada")
-    
-    for key, value in work_data.dict().items():
-        setattr(work, key, value)
-    
-    db.commit()
-    db.refresh(work)
     return work
 
 @app.delete("/api/v1/admin/obras/{work_id}", response_model=dict)
@@ -272,7 +294,7 @@ async def delete_obra_admin(
     current_admin: models.User = Depends(auth.get_current_admin_user),
     db: Session = Depends(database.get_db)
 ):
-    work = db.query(models.Work).filter(models.Work.id == work_id).first()
+    work = crud.get_work(db, work_id)
     if not work:
         raise HTTPException(status_code=404, detail="Obra no encontrada")
     
@@ -284,19 +306,16 @@ async def delete_obra_admin(
 @app.post("/works/", response_model=schemas.Work)
 def create_work(work: schemas.WorkCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_active_user)):
     # Verificar si el número de obra ya existe
-    db_work = db.query(models.Work).filter(models.Work.work_number == work.work_number).first()
+    db_work = crud.get_work_by_number(db, work.work_number)
     if db_work:
         raise HTTPException(status_code=400, detail="El número de obra ya existe")
     
-    db_work = models.Work(**work.dict())
-    db.add(db_work)
-    db.commit()
-    db.refresh(db_work)
+    db_work = group_commit.run_write(db, crud.add_work, work)
     return db_work
 
 @app.get("/works/", response_model=List[schemas.Work])
-def read_works(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_active_user)):
-    works = db.query(models.Work).offset(skip).limit(limit).all()
+def read_works(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_read_db), current_user: models.User = Depends(auth.get_current_active_user_read)):
+    works = crud.get_works(db, skip=skip, limit=limit)
     return works
 
 # Puedes añadir más routers aquí para organizar mejor si la app crece
@@ -312,7 +331,7 @@ def create_user(
     current_user: models.User = Depends(auth.get_current_admin_user)
 ):
     # Verificar si el número de empleado ya existe
-    db_user = db.query(models.User).filter(models.User.employee_number == user.employee_number).first()
+    db_user = crud.get_user_by_employee_number(db, employee_number=user.employee_number)
     if db_user:
         raise HTTPException(status_code=400, detail="El número de empleado ya existe")
     
@@ -334,8 +353,58 @@ def create_user(
 def read_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_admin_user)
 ):
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
\ No newline at end of file
+    users = crud.get_users(db, skip=skip, limit=limit)
+    return users
+
+# --- Rutas de Informes (Rapports) ---
+
+def _get_report_job_for_user(db: Session, job_id: int, current_user: models.User):
+    job = crud.get_report_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Informe no encontrado")
+    if job.requested_by != current_user.id and not current_user.isAdmin:
+        raise HTTPException(status_code=403, detail="No tiene permisos para acceder a este informe")
+    return job
+
+@app.post("/api/v1/reports/", response_model=schemas.ReportJob, status_code=status.HTTP_202_ACCEPTED)
+def create_report(
+    report: schemas.ReportJobCreate,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    # Un usuario normal solo puede generar informes de sus propias obras
+    if not current_user.isAdmin:
+        if report.user_id is not None and report.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Solo puede generar informes de sus propias obras")
+        report.user_id = current_user.id
+
+    job = crud.create_report_job(db, job=report, requested_by=current_user.id)
+    reports.submit_report_job(job.id)
+    return job
+
+@app.get("/api/v1/reports/", response_model=List[schemas.ReportJob])
+def read_reports(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    return crud.get_report_jobs(db, requested_by=current_user.id, skip=skip, limit=limit)
+
+@app.get("/api/v1/reports/{job_id}", response_model=schemas.ReportJob)
+def read_report(job_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_active_user)):
+    return _get_report_job_for_user(db, job_id, current_user)
+
+@app.get("/api/v1/reports/{job_id}/download")
+def download_report(job_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_active_user)):
+    job = _get_report_job_for_user(db, job_id, current_user)
+    if job.status != "completed" or not job.file_path:
+        raise HTTPException(status_code=409, detail="El informe todavía no está disponible")
+    return FileResponse(
+        job.file_path,
+        media_type=reports.MEDIA_TYPES[job.format],
+        filename=reports.report_filename(job)
+    )
@@ -35,3 +35,35 @@ class Work(Base):
     # Relación con el usuario creador
     creator = relationship("User", back_populates="works")
 
+
+class ReportJob(Base):
+    __tablename__ = "report_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    requested_by = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    format = Column(String, default="csv") # csv, xlsx o pdf
+    status = Column(String, default="pending", index=True) # pending, running, completed, failed
+
+    # Filtros aplicados sobre las obras
+    filter_user_id = Column(Integer, nullable=True)
+    filter_status = Column(String, nullable=True)
+    date_from = Column(DateTime(timezone=True), nullable=True)
+    date_to = Column(DateTime(timezone=True), nullable=True)
+
+    # Progreso y resultado
+    total_rows = Column(Integer, default=0)
+    processed_rows = Column(Integer, default=0)
+    file_path = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True) # Último avance del worker que lo genera
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    @property
+    def progress(self):
+        # Porcentaje completado (0-100)
+        if self.status == "completed":
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, int(self.processed_rows * 100 / self.total_rows))
@@ -0,0 +1,241 @@
+import os
+import csv
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from dotenv import load_dotenv
+
+from . import models, crud, database
+
+load_dotenv()
+
+# Configuración de la generación de informes
+REPORTS_DIR = os.getenv("REPORTS_DIR", "./reports")
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 2))
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", 500))
+# Segundos sin avance tras los que un trabajo running se da por abandonado
+REPORT_STALE_SECONDS = int(os.getenv("REPORT_STALE_SECONDS", 120))
+# Cada cuántos segundos se buscan trabajos abandonados
+REPORT_REAP_SECONDS = int(os.getenv("REPORT_REAP_SECONDS", 30))
+
+REPORT_COLUMNS = ["id", "work_number", "title", "description", "status", "created_at", "updated_at", "user_id"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # `spawn` en lugar de `fork`: el pool se crea desde un hilo de petición con
+            # otros hilos activos, y un hijo creado con fork podría heredar un lock tomado
+            # (p. ej. el de las estadísticas de caché) o conexiones abiertas del padre
+            _executor = ProcessPoolExecutor(
+                max_workers=REPORT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def _discard_executor(broken: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def submit_report_job(job_id: int):
+    # Si un worker murió (p. ej. por falta de memoria) el pool queda roto y rechaza
+    # todo lo que se le envía: se descarta, se crea otro y se reintenta una vez
+    for _ in range(2):
+        executor = get_executor()
+        try:
+            executor.submit(run_report_job, job_id)
+            return
+        except BrokenProcessPool:
+            _discard_executor(executor)
+
+    db = database.SessionLocal()
+    try:
+        crud.fail_report_job(db, job_id, "No se pudo iniciar el proceso de generación", datetime.now(timezone.utc))
+    finally:
+        db.close()
+
+def resume_report_jobs():
+    # Reencola los trabajos que quedaron a medias (su worker dejó de dar señales)
+    # y los pendientes que nadie ha reclamado. Los que otro worker vivo está
+    # generando no se tocan; si un trabajo se encola dos veces, solo uno de los
+    # procesos logra reclamarlo
+    db = database.SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        job_ids = crud.requeue_stale_report_jobs(db, now - timedelta(seconds=REPORT_STALE_SECONDS), now)
+    finally:
+        db.close()
+    for job_id in job_ids:
+        submit_report_job(job_id)
+
+def _reap_report_jobs(stop: threading.Event):
+    # Revisión periódica: recupera los trabajos de workers caídos sin esperar a otro reinicio
+    while True:
+        try:
+            resume_report_jobs()
+        except Exception as e:
+            print(f"Error al reencolar informes: {e}")
+        if stop.wait(REPORT_REAP_SECONDS):
+            return
+
+_reaper_stop: Optional[threading.Event] = None
+
+def start_reaper():
+    global _reaper_stop
+    if _reaper_stop is None:
+        _reaper_stop = threading.Event()
+        threading.Thread(target=_reap_report_jobs, args=(_reaper_stop,), name="report-reaper", daemon=True).start()
+
+def stop_reaper():
+    global _reaper_stop
+    if _reaper_stop is not None:
+        _reaper_stop.set()
+        _reaper_stop = None
+
+def build_works_query(db, job: models.ReportJob):
+    query = db.query(models.Work)
+    if job.filter_user_id is not None:
+        query = query.filter(models.Work.user_id == job.filter_user_id)
+    if job.filter_status is not None:
+        query = query.filter(models.Work.status == job.filter_status)
+    if job.date_from is not None:
+        query = query.filter(models.Work.created_at >= job.date_from)
+    if job.date_to is not None:
+        query = query.filter(models.Work.created_at <= job.date_to)
+    return query
+
+def _row(work: models.Work):
+    return [getattr(work, column) for column in REPORT_COLUMNS]
+
+# --- Escritores por formato ---
+# Cada escritor recibe un iterable de bloques de filas y los vuelca al fichero
+# sin cargar la tabla completa en memoria
+
+def _write_csv(path, chunks):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_COLUMNS)
+        for rows in chunks:
+            writer.writerows(rows)
+
+def _write_xlsx(path, chunks):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Obras")
+    ws.append(REPORT_COLUMNS)
+    for rows in chunks:
+        for row in rows:
+            # openpyxl no admite fechas con zona horaria
+            ws.append([value.replace(tzinfo=None) if isinstance(value, datetime) else value for value in row])
+    wb.save(path)
+
+def _write_pdf(path, chunks):
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfgen import canvas
+
+    page_width, page_height = landscape(A4)
+    margin = 30
+    line_height = 12
+    col_width = (page_width - 2 * margin) / len(REPORT_COLUMNS)
+
+    pdf = canvas.Canvas(path, pagesize=(page_width, page_height))
+
+    def draw_line(values, y, font="Helvetica"):
+        pdf.setFont(font, 7)
+        for i, value in enumerate(values):
+            text = "" if value is None else str(value)
+            pdf.drawString(margin + i * col_width, y, text[:30])
+
+    y = page_height - margin
+    draw_line(REPORT_COLUMNS, y, font="Helvetica-Bold")
+    for rows in chunks:
+        for row in rows:
+            y -= line_height
+            if y < margin:
+                pdf.showPage()
+                y = page_height - margin
+                draw_line(REPORT_COLUMNS, y, font="Helvetica-Bold")
+                y -= line_height
+            draw_line(row, y)
+    pdf.save()
+
+WRITERS = {
+    "csv": _write_csv,
+    "xlsx": _write_xlsx,
+    "pdf": _write_pdf,
+}
+
+def report_filename(job: models.ReportJob):
+    return f"rapport_{job.id}.{job.format}"
+
+def run_report_job(job_id: int):
+    """Genera el informe de un trabajo. Se ejecuta en un proceso del pool."""
+    db = database.SessionLocal()
+    try:
+        if not crud.claim_report_job(db, job_id, datetime.now(timezone.utc)):
+            return
+
+        job = crud.get_report_job(db, job_id)
+        job.total_rows = build_works_query(db, job).count()
+        db.commit()
+
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        path = os.path.join(REPORTS_DIR, report_filename(job))
+
+        def chunks():
+            # Paginación por clave (id > último id) para leer la tabla por bloques
+            # sin mantener un cursor abierto mientras se guarda el progreso
+            last_id = 0
+            processed = 0
+            while True:
+                works = (
+                    build_works_query(db, job)
+                    .filter(models.Work.id > last_id)
+                    .order_by(models.Work.id)
+                    .limit(REPORT_CHUNK_SIZE)
+                    .all()
+                )
+                if not works:
+                    break
+                yield [_row(work) for work in works]
+                last_id = works[-1].id
+                processed += len(works)
+                job.processed_rows = processed
+                job.heartbeat_at = datetime.now(timezone.utc)
+                db.commit()
+
+        WRITERS[job.format](path, chunks())
+
+        db.refresh(job)
+        job.status = "completed"
+        job.processed_rows = job.total_rows
+        job.file_path = path
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        crud.fail_report_job(db, job_id, str(e), datetime.now(timezone.utc))
+    finally:
+        db.close()
@@ -1,7 +1,7 @@
 import re
 from pydantic import BaseModel, Field, validator, EmailStr
-from typing import Optional, Union
-from datetime import datetime
+from typing import Literal, Optional, Union
+from datetime import datetime, timezone
 
 # Regex simple para validar teléfono (ajustar según necesidad)
 # Este ejemplo busca formatos como + prefijo y luego 9 o más dígitos
@@ -72,3 +72,39 @@ class Work(WorkBase):
     class Config:
         from_attributes = True
 
+
+# Esquemas para los trabajos de generación de informes (rapports)
+class ReportJobCreate(BaseModel):
+    format: Literal["csv", "xlsx", "pdf"] = "csv"
+    user_id: Optional[int] = None
+    status: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+    @validator('date_from', 'date_to')
+    def dates_to_utc(cls, v):
+        # Work.created_at se guarda en UTC: las fechas con zona se convierten a UTC
+        # y las que no la traen se interpretan ya como UTC
+        if v is None:
+            return v
+        if v.tzinfo is None:
+            return v.replace(tzinfo=timezone.utc)
+        return v.astimezone(timezone.utc)
+
+class ReportJob(BaseModel):
+    id: int
+    format: str
+    status: str
+    filter_user_id: Optional[int] = None
+    filter_status: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    total_rows: int
+    processed_rows: int
+    progress: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,87 @@
+from sqlalchemy import Integer, bindparam, or_, select, update
+from . import models
+
+# Sentencias precompiladas (estilo SQLAlchemy 2.0) para las consultas más frecuentes.
+# Se construyen una sola vez al importar el módulo y los valores se pasan como
+# parámetros enlazados, de modo que cada llamada reutiliza la clave de caché y la
+# compilación guardada por el engine en lugar de reconstruir la consulta.
+
+# --- Usuarios ---
+user_by_id = select(models.User).where(models.User.id == bindparam("user_id"))
+
+user_by_employee_number = select(models.User).where(
+    models.User.employee_number == bindparam("employee_number")
+)
+
+users_page = (
+    select(models.User)
+    .order_by(models.User.id)
+    .offset(bindparam("skip", type_=Integer))
+    .limit(bindparam("limit", type_=Integer))
+)
+
+# --- Obras ---
+work_by_id = select(models.Work).where(models.Work.id == bindparam("work_id"))
+
+work_by_number = select(models.Work).where(models.Work.work_number == bindparam("work_number"))
+
+works_page = (
+    select(models.Work)
+    .order_by(models.Work.id)
+    .offset(bindparam("skip", type_=Integer))
+    .limit(bindparam("limit", type_=Integer))
+)
+
+works_by_user_page = (
+    select(models.Work)
+    .where(models.Work.user_id == bindparam("user_id"))
+    .order_by(models.Work.id)
+    .offset(bindparam("skip", type_=Integer))
+    .limit(bindparam("limit", type_=Integer))
+)
+
+# --- Informes ---
+report_job_by_id = select(models.ReportJob).where(models.ReportJob.id == bindparam("job_id"))
+
+report_jobs_by_user_page = (
+    select(models.ReportJob)
+    .where(models.ReportJob.requested_by == bindparam("requested_by"))
+    .order_by(models.ReportJob.id.desc())
+    .offset(bindparam("skip", type_=Integer))
+    .limit(bindparam("limit", type_=Integer))
+)
+
+# UPDATE condicional: solo pasa a running si sigue pending
+claim_report_job = (
+    update(models.ReportJob)
+    .where(models.ReportJob.id == bindparam("job_id"), models.ReportJob.status == "pending")
+    .values(status="running", processed_rows=0, error=None, heartbeat_at=bindparam("now"))
+    .execution_options(synchronize_session=False)
+)
+
+# Los running sin señales del worker vuelven a pending, listos para reencolarse
+requeue_stale_report_jobs = (
+    update(models.ReportJob)
+    .where(
+        models.ReportJob.status == "running",
+        or_(models.ReportJob.heartbeat_at.is_(None), models.ReportJob.heartbeat_at < bindparam("stale_before")),
+    )
+    .values(status="pending", processed_rows=0, heartbeat_at=None)
+    .execution_options(synchronize_session=False)
+)
+
+# En los pending, heartbeat_at guarda cuándo se encolaron por última vez
+stale_pending_report_job_ids = select(models.ReportJob.id).where(
+    models.ReportJob.status == "pending",
+    or_(models.ReportJob.heartbeat_at.is_(None), models.ReportJob.heartbeat_at < bindparam("stale_before")),
+)
+
+touch_pending_report_jobs = (
+    update(models.ReportJob)
+    .where(
+        models.ReportJob.id.in_(bindparam("job_ids", expanding=True)),
+        models.ReportJob.status == "pending",
+    )
+    .values(heartbeat_at=bindparam("now"))
+    .execution_options(synchronize_session=False)
+)
@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmark de escrituras/segundo: un commit por petición frente a group commit.
+# Cada "petición" es una actualización pequeña de una obra, lanzadas en paralelo
+# desde varios hilos contra una base de datos SQLite en fichero.
+#   python bench_group_commit.py [hilos] [escrituras_por_hilo]
+
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["GROUP_COMMIT"] = "false"  # La referencia usa el commit por petición
+
+from app import models, schemas, crud, database, group_commit
+
+def setup_db(n_works):
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    user = models.User(employee_number="00bench", first_name="Bench", last_name="Mark", contact="b@m.com")
+    db.add(user)
+    db.flush()
+    for i in range(n_works):
+        db.add(models.Work(work_number=f"B{i:04d}", title="Obra", description="-", user_id=user.id))
+    db.commit()
+    db.close()
+
+def work_update(i, j):
+    return schemas.WorkCreate(work_number=f"B{i:04d}", title=f"Obra {j}", description="-")
+
+def per_request_commit(i, j):
+    db = database.SessionLocal()
+    try:
+        # Mismo camino que las rutas con GROUP_COMMIT desactivado: commit + refresh
+        group_commit.run_write(db, crud.apply_work_update, i + 1, work_update(i, j))
+    finally:
+        db.close()
+
+def measure(name, write, threads, writes_per_thread):
+    def client(i):
+        for j in range(writes_per_thread):
+            write(i, j)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(client, range(threads)))
+    elapsed = time.perf_counter() - start
+    total = threads * writes_per_thread
+    print(f"{name:<28}{total:>8} escrituras en {elapsed:6.2f}s  ->  {total / elapsed:8.0f} escrituras/s")
+    return total / elapsed
+
+def run(threads, writes_per_thread):
+    setup_db(threads)
+
+    baseline = measure("commit por petición", per_request_commit, threads, writes_per_thread)
+
+    writer = group_commit.GroupCommitWriter()
+    try:
+        def grouped(i, j):
+            writer.submit(crud.apply_work_update, i + 1, work_update(i, j)).result()
+
+        grouped_rate = measure(
+            f"group commit ({writer.window * 1000:g} ms / {writer.max_ops} ops)", grouped, threads, writes_per_thread
+        )
+    finally:
+        writer.stop()
+
+    print(f"mejora: {grouped_rate / baseline:.1f}x")
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 32,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+    )
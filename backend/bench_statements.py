@@ -0,0 +1,76 @@
+import os
+import sys
+import timeit
+
+# Microbenchmark del coste por llamada de las consultas de crud:
+# consulta clásica `db.query(...)` construida en cada llamada frente a
+# las sentencias precompiladas de app/statements.py.
+#   python bench_statements.py [repeticiones]
+
+os.environ["DATABASE_URL"] = "sqlite://"  # Base de datos en memoria
+
+from sqlalchemy.pool import StaticPool
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import models, crud, database
+
+def setup_db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+        query_cache_size=database.SQL_QUERY_CACHE_SIZE
+    )
+    models.Base.metadata.create_all(bind=engine)
+    db = Session(engine)
+    user = models.User(employee_number="00bench", first_name="Bench", last_name="Mark", contact="b@m.com")
+    db.add(user)
+    db.flush()
+    for i in range(200):
+        db.add(models.Work(work_number=f"B{i:04d}", title=f"Obra {i}", description="-", user_id=user.id))
+    db.commit()
+    return db, user
+
+# Versiones anteriores (db.query) para comparar
+def legacy_get_user(db, user_id):
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
+def legacy_get_user_by_employee_number(db, employee_number):
+    return db.query(models.User).filter(models.User.employee_number == employee_number).first()
+
+def legacy_get_users(db, skip=0, limit=100):
+    return db.query(models.User).offset(skip).limit(limit).all()
+
+def legacy_get_work(db, work_id):
+    return db.query(models.Work).filter(models.Work.id == work_id).first()
+
+def legacy_get_works(db, user_id=None, skip=0, limit=100):
+    query = db.query(models.Work)
+    if user_id is not None:
+        query = query.filter(models.Work.user_id == user_id)
+    return query.offset(skip).limit(limit).all()
+
+def run(number):
+    db, user = setup_db()
+    cases = [
+        ("get_user", lambda: legacy_get_user(db, user.id), lambda: crud.get_user(db, user.id)),
+        ("get_user_by_employee_number",
+         lambda: legacy_get_user_by_employee_number(db, "00bench"),
+         lambda: crud.get_user_by_employee_number(db, "00bench")),
+        ("get_users", lambda: legacy_get_users(db), lambda: crud.get_users(db)),
+        ("get_work", lambda: legacy_get_work(db, 1), lambda: crud.get_work(db, 1)),
+        ("get_works(user_id)", lambda: legacy_get_works(db, user_id=user.id, limit=10),
+         lambda: crud.get_works(db, user_id=user.id, limit=10)),
+    ]
+
+    print(f"{'consulta':<30}{'antes (us)':>12}{'después (us)':>14}{'mejora':>9}")
+    for name, before, after in cases:
+        # Calentar la caché de compilación antes de medir
+        before()
+        after()
+        t_before = min(timeit.repeat(before, number=number, repeat=5)) / number * 1e6
+        t_after = min(timeit.repeat(after, number=number, repeat=5)) / number * 1e6
+        print(f"{name:<30}{t_before:>12.1f}{t_after:>14.1f}{t_before / t_after:>8.2f}x")
+    db.close()
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,34 @@
+import os
+import sqlite3
+from dotenv import load_dotenv
+
+# Copia la base de datos SQLite principal sobre la réplica de lectura local.
+# Sirve para probar READ_DATABASE_URL sin un servidor de réplica real:
+#   DATABASE_URL=sqlite:///./sql_app.db
+#   READ_DATABASE_URL=sqlite:///./sql_app_replica.db
+# Ejecutar periódicamente (o a mano) simula el retraso de replicación.
+
+load_dotenv()
+
+def sqlite_path(url: str):
+    if not url.startswith("sqlite:///"):
+        raise ValueError(f"Solo se admiten URLs de SQLite: {url}")
+    return url[len("sqlite:///"):]
+
+def sync_replica():
+    primary_url = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+    replica_url = os.getenv("READ_DATABASE_URL", "sqlite:///./sql_app_replica.db")
+
+    primary = sqlite3.connect(sqlite_path(primary_url))
+    replica = sqlite3.connect(sqlite_path(replica_url))
+    try:
+        # La API de backup hace una copia consistente aunque el primario esté en uso
+        primary.backup(replica)
+    finally:
+        replica.close()
+        primary.close()
+
+    print(f"Réplica sincronizada: {replica_url}")
+
+if __name__ == "__main__":
+    sync_replica()
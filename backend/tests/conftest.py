@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+# La base de datos de pruebas se configura antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+
+import pytest
+
+from app import models, database, group_commit
+
+@pytest.fixture(autouse=True)
+def tables():
+    models.Base.metadata.create_all(bind=database.engine)
+    yield
+    models.Base.metadata.drop_all(bind=database.engine)
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def writer():
+    writer = group_commit.GroupCommitWriter(window_ms=50)
+    yield writer
+    writer.stop()
+
+@pytest.fixture
+def user(db):
+    db_user = models.User(employee_number="00test", first_name="Test", last_name="User", contact="t@u.com")
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
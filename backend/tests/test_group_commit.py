@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app import crud, database, group_commit, models, schemas
+
+def work(number, title="Obra"):
+    return schemas.WorkCreate(work_number=number, title=title, description="-")
+
+def test_write_waits_for_concurrent_sqlite_writer(writer, db, user):
+    db_work = crud.add_work(db, work("LOCK"), user.id)
+    db.commit()
+
+    # Otra conexión tiene la base de datos reservada para escribir durante un momento
+    other = sqlite3.connect(database.engine.url.database, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    other.execute("UPDATE works SET description = 'otro' WHERE id = ?", (db_work.id,))
+
+    def release():
+        time.sleep(0.3)
+        other.execute("COMMIT")
+        other.close()
+
+    releaser = threading.Thread(target=release)
+    releaser.start()
+    try:
+        updated = writer.submit(crud.apply_work_update, db_work.id, work("LOCK", "Agrupada")).result(timeout=10)
+    finally:
+        releaser.join()
+
+    assert updated.title == "Agrupada"
+
+def test_futures_resolve_when_rollback_fails(writer, user):
+    make_session = writer.SessionLocal
+
+    def failing(*args, **kwargs):
+        raise RuntimeError("sin conexión")
+
+    def broken_session():
+        session = make_session()
+        session.commit = failing
+        session.rollback = failing
+        return session
+
+    writer.SessionLocal = broken_session
+    future = writer.submit(crud.add_work, work("ROTA"), user.id)
+    with pytest.raises(RuntimeError, match="sin conexión"):
+        future.result(timeout=10)
+
+    # El hilo escritor sigue vivo y atiende el siguiente lote
+    writer.SessionLocal = make_session
+    assert writer.is_alive()
+    assert writer.submit(crud.add_work, work("SANA"), user.id).result(timeout=10).work_number == "SANA"
+
+def test_stopped_writer_fails_fast_and_is_replaced(monkeypatch, writer, user):
+    writer.stop()
+    with pytest.raises(RuntimeError):
+        writer.submit(crud.add_work, work("TARDE"), user.id)
+
+    monkeypatch.setattr(group_commit, "_writer", writer)
+    replacement = group_commit.get_writer()
+    try:
+        assert replacement is not writer
+        assert replacement.submit(crud.add_work, work("NUEVA"), user.id).result(timeout=10).work_number == "NUEVA"
+    finally:
+        replacement.stop()
+
+def test_result_is_acknowledged_after_shared_commit(writer, user):
+    committed = threading.Event()
+    event.listen(writer.SessionLocal, "after_commit", lambda session: committed.set())
+
+    created = writer.submit(crud.add_work, work("ACK"), user.id).result(timeout=10)
+
+    assert committed.is_set()
+    other = database.SessionLocal()
+    try:
+        assert crud.get_work(other, created.id).work_number == "ACK"
+    finally:
+        other.close()
+
+def test_failed_operation_only_affects_its_savepoint(writer, db, user):
+    futures = [
+        writer.submit(crud.add_work, work(number), user.id)
+        for number in ("A", "B", "A", "C")
+    ]
+
+    assert futures[0].result(timeout=10).work_number == "A"
+    assert futures[1].result(timeout=10).work_number == "B"
+    with pytest.raises(IntegrityError):
+        futures[2].result(timeout=10)
+    assert futures[3].result(timeout=10).work_number == "C"
+
+    numbers = sorted(w.work_number for w in db.query(models.Work).all())
+    assert numbers == ["A", "B", "C"]
+
+def test_failed_commit_fails_whole_batch(writer, db, user):
+    def fail_commit(session):
+        raise RuntimeError("commit fallido")
+
+    event.listen(writer.SessionLocal, "before_commit", fail_commit)
+    futures = [writer.submit(crud.add_work, work(number), user.id) for number in ("X", "Y", "Z")]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="commit fallido"):
+            future.result(timeout=10)
+    assert db.query(models.Work).count() == 0